@@ -0,0 +1,1451 @@
+#!/usr/bin/env python3
+
+"""
+model.py: agent-based model of the xSD protocol, running against the real
+contracts on a local ganache chain.
+
+Expects a ganache instance on localhost with the protocol migrated into it
+(see protocol/migrations), plus a funded set of unlocked accounts. Every
+agent is one of those accounts; each simulated block the agents look at the
+chain state and pick something profitable (they hope) to do with their
+xSD, USDC, coupons, and Uniswap liquidity.
+
+Writes a TSV log of per-block market state to log.tsv.
+"""
+
+import collections
+import concurrent.futures
+import functools
+import json
+import logging
+import math
+import os
+import pickle
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+from sortedcontainers import SortedList
+from web3 import Web3
+
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional; without it the jitted helpers run as plain Python.
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrap(func):
+            return func
+        return wrap
+
+# Connect to the local ganache chain that has the protocol deployed on it.
+# HTTP with a keep-alive session benchmarks faster than ganache's
+# websocket transport here, and unlike a single websocket it allows
+# multiple requests in flight at once. IPC would be faster still but
+# ganache's IPC support is flaky.
+# The agent phase fans its reads and transactions out over the model's
+# thread pool, so size the HTTP connection pool to cover every worker;
+# the default of 10 pooled connections makes the extra workers block on
+# a free socket instead of running latency-bound on max(RTT).
+_session = requests.Session()
+_session.mount('http://', requests.adapters.HTTPAdapter(
+    pool_connections=4, pool_maxsize=32))
+provider = Web3.HTTPProvider(
+    os.environ.get('XSD_RPC_URL', 'http://localhost:7545'),
+    request_kwargs={'timeout': 60},
+    session=_session)
+# provider = Web3.WebsocketProvider('ws://localhost:7545', websocket_timeout=60)
+# provider = Web3.IPCProvider("./development.ipc")
+w3 = Web3(provider)
+
+# Hot-path diagnostics go through the lazy %s-formatting logger, so at
+# INFO and above the per-agent debug lines cost one disabled-level check
+# instead of a dict construction and an stdout flush.
+logger = logging.getLogger(__name__)
+
+# Paths of the ABIs for the protocol contracts that ship with the repo,
+# and for the mock/Uniswap contracts that truffle compiles into
+# protocol/build. Loaded lazily through load_abi() so importing the
+# module doesn't parse megabytes of JSON.
+IMPLEMENTATION_JSON_PATH = 'protocol/abi/Implementation.json'
+ROOT_JSON_PATH = 'protocol/abi/Root.json'
+POOL_JSON_PATH = 'protocol/abi/Pool.json'
+DOLLAR_JSON_PATH = 'protocol/abi/Dollar.json'
+TESTNET_USDC_JSON_PATH = 'protocol/build/contracts/TestnetUSDC.json'
+MOCK_ORACLE_JSON_PATH = 'protocol/build/contracts/MockOracle.json'
+UNISWAP_PAIR_JSON_PATH = 'protocol/node_modules/@uniswap/v2-core/build/IUniswapV2Pair.json'
+UNISWAP_ERC20_JSON_PATH = 'protocol/node_modules/@uniswap/v2-core/build/IUniswapV2ERC20.json'
+UNISWAP_ROUTER_JSON_PATH = 'protocol/build/contracts/UniswapV2Router02.json'
+
+
+@functools.lru_cache(maxsize=None)
+def load_abi(path):
+    """
+    Load a (possibly multi-megabyte) truffle contract JSON. Keeps a
+    pickle next to the JSON, keyed by mtime, because unpickling a big
+    dict is several times faster than re-parsing the JSON every start.
+    """
+    pickled = path + '.pkl'
+    try:
+        if os.path.getmtime(pickled) >= os.path.getmtime(path):
+            with open(pickled, 'rb') as stream:
+                return pickle.load(stream)
+    except (OSError, pickle.UnpicklingError):
+        pass
+    with open(path) as stream:
+        parsed = json.loads(stream.read())
+    try:
+        with open(pickled, 'wb') as stream:
+            pickle.dump(parsed, stream)
+    except OSError:
+        # Somewhere read-only; just pay the JSON parse next time too.
+        pass
+    return parsed
+
+# Token metadata, with the addresses the deterministic ganache migration
+# puts everything at.
+xSD = {
+    'addr': '0x443D2f2755DB5942601fa062Cc248aAA153313D3',
+    'decimals': 18,
+    'symbol': 'xSD',
+}
+USDC = {
+    'addr': '0xCfEB869F69431e42cdB54A4F4f105C19C080A601',
+    'decimals': 6,
+    'symbol': 'USDC',
+}
+# DAO shares live at the Root proxy, which speaks the Implementation ABI.
+xSDS = {
+    'addr': '0x254dffcd3277C0b1660F6d42EFbB754edaBAbC2B',
+    'decimals': 18,
+    'symbol': 'xSDS',
+}
+# The Uniswap xSD:USDC pair, which doubles as the LP token.
+UNI = {
+    'addr': '0x88ff79eB2Bc5850F27315415da8685282C7610F9',
+    'decimals': 18,
+    'symbol': 'UNI-V2',
+}
+UNIV2Router = {
+    'addr': '0x9561C133DD8580860B6b7E504bC5Aa500f0f06a7',
+}
+# MakerDAO Multicall2, deployed by the migration so we can aggregate reads.
+MULTICALL2 = {
+    'addr': '0xC89Ce4735882C9F0f0FE26686c53074E09B0D550',
+}
+
+# Just enough of the Multicall2 ABI to aggregate eth_calls.
+MULTICALL2_ABI = [
+    {
+        'name': 'aggregate',
+        'type': 'function',
+        'stateMutability': 'nonpayable',
+        'inputs': [
+            {
+                'name': 'calls',
+                'type': 'tuple[]',
+                'components': [
+                    {'name': 'target', 'type': 'address'},
+                    {'name': 'callData', 'type': 'bytes'},
+                ],
+            },
+        ],
+        'outputs': [
+            {'name': 'blockNumber', 'type': 'uint256'},
+            {'name': 'returnData', 'type': 'bytes[]'},
+        ],
+    },
+]
+
+UINT256_MAX = 2**256 - 1
+
+# Token decimals as module-level ints, so the hot paths skip the dict
+# lookup when tagging a Balance.
+XSD_D = xSD['decimals']
+USDC_D = USDC['decimals']
+UNI_D = UNI['decimals']
+XSDS_D = xSDS['decimals']
+
+# Atomic units per whole token.
+WEI_XSD = 10**18
+WEI_USDC = 10**6
+
+# How many seconds ahead of chain time Uniswap transaction deadlines sit.
+DEADLINE_FROM_NOW = 60 * 60
+
+# Bit positions for Agent._approvals. Testing `approvals & APPROVAL_X`
+# is one C-level AND instead of four separate bool attributes.
+APPROVAL_USDC = 1
+APPROVAL_XSD = 2
+APPROVAL_UNISWAP = 4
+APPROVAL_DAO = 8
+APPROVAL_ALL = APPROVAL_USDC | APPROVAL_XSD | APPROVAL_UNISWAP | APPROVAL_DAO
+
+# Canonical order of the actions agents can take, for strategy weight
+# vectors indexed by action number.
+ACTIONS = ('buy', 'sell', 'coupon_bid', 'redeem', 'provide_liquidity', 'remove_liquidity')
+ACTION_INDEX = {name: index for index, name in enumerate(ACTIONS)}
+
+# All 64 possible action-eligibility masks, pre-expanded to weight
+# vectors over ACTIONS, so an agent's eligibility is one bitmask build
+# and one table row lookup instead of six element stores.
+_ELIGIBILITY = np.array(
+    [[(mask >> index) & 1 for index in range(len(ACTIONS))]
+     for mask in range(1 << len(ACTIONS))],
+    dtype=np.float64)
+
+
+# Pre-encoded approve(spender, UINT256_MAX) calldata per (token, spender),
+# so the 256-bit constant is ABI-encoded once per contract rather than
+# once per agent.
+_APPROVE_CALLDATA = {}
+
+
+def approve_calldata(token, spender):
+    """
+    Get cached calldata for token.approve(spender, UINT256_MAX).
+    """
+    key = (token.address, spender)
+    data = _APPROVE_CALLDATA.get(key)
+    if data is None:
+        data = token.encodeABI(fn_name='approve', args=[spender, UINT256_MAX])
+        _APPROVE_CALLDATA[key] = data
+    return data
+
+
+# Memoized ContractCaller objects, keyed by contract instance and
+# calling address. Building a caller re-binds the whole ABI, which is a
+# heavy allocation to repeat on every read in the agent loop.
+_CALLERS = {}
+
+
+def caller_for(contract, call_kwargs):
+    """
+    Get a memoized ContractCaller for the given contract and call kwargs.
+    """
+    key = (id(contract), call_kwargs['from'])
+    caller = _CALLERS.get(key)
+    if caller is None:
+        caller = _CALLERS[key] = contract.caller(call_kwargs)
+    return caller
+
+
+def get_nonce(address):
+    """
+    Get the next nonce to use for a transaction from the given address.
+    """
+    return w3.eth.get_transaction_count(address)
+
+
+def get_nonces(addresses):
+    """
+    Get the next nonces for many addresses at once, as one JSON-RPC
+    batch request instead of an eth_getTransactionCount round trip per
+    address. Falls back to individual calls if the node rejects batches.
+    """
+    batch = [
+        {'jsonrpc': '2.0', 'id': i,
+         'method': 'eth_getTransactionCount', 'params': [address, 'latest']}
+        for i, address in enumerate(addresses)]
+    try:
+        responses = _session.post(
+            provider.endpoint_uri, json=batch, timeout=60).json()
+        results = {response['id']: int(response['result'], 16)
+                   for response in responses}
+        return {address: results[i] for i, address in enumerate(addresses)}
+    except Exception:
+        return {address: get_nonce(address) for address in addresses}
+
+
+def portion_dedusted(total, fraction):
+    """
+    Compute the given fraction of the total Balance, unless the leftover
+    would be dust, in which case take everything. Does its math on raw
+    atomic units so no intermediate Balances get allocated.
+    """
+    # Note: this stays Python int math rather than going through the
+    # jitted helpers, because 18-decimal balances overflow int64.
+    taken = int(total.to_wei() * fraction)
+    if total.to_wei() - taken <= 1:
+        return total
+    return Balance(taken, total.decimals)
+
+
+@njit(cache=True)
+def _v2_amount_out(amount_in, reserve_in, reserve_out):
+    """
+    Uniswap V2 constant-product output amount, fees included, on floats.
+    """
+    amount_in_with_fee = amount_in * 997.0
+    return (amount_in_with_fee * reserve_out) / (reserve_in * 1000.0 + amount_in_with_fee)
+
+
+# One full period of the faith sine wave, sampled per block. Faith
+# depends only on the block number, so the per-agent math.sin calls
+# collapse into one table lookup.
+_SIN_TABLE = [math.sin(b * (2 * math.pi / 5000)) for b in range(5000)]
+
+
+def _faith_at_block(block, min_faith, max_faith):
+    """
+    The shared faith sine wave, served from the precomputed table.
+    """
+    center_faith = (max_faith + min_faith) / 2
+    swing_faith = (max_faith - min_faith) / 2
+    return center_faith + swing_faith * _SIN_TABLE[block % 5000]
+
+
+# Scale factors for the decimals counts we actually see, so cross-decimal
+# conversions don't recompute powers of ten.
+_POW10 = {d: 10**d for d in (0, 6, 12, 18)}
+
+
+def _pow10(decimals):
+    """
+    Get 10**decimals, cached for the usual token decimal counts.
+    """
+    scale = _POW10.get(decimals)
+    if scale is None:
+        scale = 10**decimals
+        _POW10[decimals] = scale
+    return scale
+
+
+class Balance:
+    """
+    A token balance, tagged with its decimals, represented internally in
+    atomic units. Balances of the same token can be added, subtracted, and
+    compared; they can also be scaled by plain numbers.
+
+    Balances are allocated constantly in the inner loops, so they carry
+    __slots__ instead of a per-instance __dict__.
+    """
+
+    __slots__ = ('_wei', '_decimals', '_scale')
+
+    def __init__(self, wei, decimals=0):
+        if wei is None:
+            wei = 0
+        self._wei = int(wei)
+        self._decimals = decimals
+        # Decimals never change after construction, so hoist the scale
+        # factor out of every arithmetic and formatting path.
+        self._scale = _pow10(decimals)
+
+    @classmethod
+    def from_tokens(cls, tokens, decimals=0):
+        """
+        Make a Balance from a whole number of tokens.
+        """
+        return cls(tokens * 10**decimals, decimals)
+
+    def clone(self):
+        """
+        Make a copy of this Balance.
+        """
+        return Balance(self._wei, self._decimals)
+
+    def to_wei(self):
+        """
+        Get the balance in atomic token units.
+        """
+        return self._wei
+
+    @property
+    def raw(self):
+        """
+        The balance in atomic token units, for raw integer math paths.
+        """
+        return self._wei
+
+    def to_decimals(self, new_decimals):
+        """
+        Get this Balance as a Balance with a different number of decimals.
+        """
+        return Balance(self._wei * _pow10(new_decimals) // self._scale, new_decimals)
+
+    @property
+    def decimals(self):
+        return self._decimals
+
+    def _check_compatible(self, other):
+        if other._decimals != self._decimals:
+            raise ValueError('Mismatched decimals: {} and {}'.format(
+                self._decimals, other._decimals))
+
+    def __add__(self, other):
+        if isinstance(other, Balance):
+            self._check_compatible(other)
+            return Balance(self._wei + other._wei, self._decimals)
+        else:
+            return Balance(self._wei + int(other * self._scale), self._decimals)
+
+    def __radd__(self, other):
+        return self + other
+
+    def __sub__(self, other):
+        if isinstance(other, Balance):
+            self._check_compatible(other)
+            return Balance(self._wei - other._wei, self._decimals)
+        else:
+            return Balance(self._wei - int(other * self._scale), self._decimals)
+
+    def __mul__(self, other):
+        # Only scaling by a plain number makes sense; token * token is not
+        # a token.
+        return Balance(int(self._wei * other), self._decimals)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return Balance(int(self._wei / other), self._decimals)
+
+    def __imul__(self, other):
+        self._wei = int(self._wei * other)
+        return self
+
+    def __itruediv__(self, other):
+        self._wei = int(self._wei / other)
+        return self
+
+    def __lt__(self, other):
+        if isinstance(other, Balance):
+            self._check_compatible(other)
+            return self._wei < other._wei
+        else:
+            return self._wei < other * self._scale
+
+    def __le__(self, other):
+        if isinstance(other, Balance):
+            self._check_compatible(other)
+            return self._wei <= other._wei
+        else:
+            return self._wei <= other * self._scale
+
+    def __gt__(self, other):
+        if isinstance(other, Balance):
+            self._check_compatible(other)
+            return self._wei > other._wei
+        else:
+            return self._wei > other * self._scale
+
+    def __ge__(self, other):
+        if isinstance(other, Balance):
+            self._check_compatible(other)
+            return self._wei >= other._wei
+        else:
+            return self._wei >= other * self._scale
+
+    def __eq__(self, other):
+        if isinstance(other, Balance):
+            return self._decimals == other._decimals and self._wei == other._wei
+        else:
+            return self._wei == other * self._scale
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __float__(self):
+        return self._wei / self._scale
+
+    def __int__(self):
+        return self._wei // self._scale
+
+    def __str__(self):
+        ipart, fpart = divmod(self._wei, self._scale)
+        return f'{ipart}.{fpart:0{self._decimals}d}'
+
+    def __repr__(self):
+        return 'Balance({}, {})'.format(self._wei, self._decimals)
+
+
+class Agent:
+    """
+    Represents an agent. Tracks all the agent's balances locally, so we
+    only have to go to the chain when the agent actually does something.
+    """
+
+    __slots__ = (
+        'xsd_token', 'usdc_token', 'uniswap_pair_token', 'dao', 'address',
+        '_next_nonce', '_call_kwargs', '_tx_kwargs_template',
+        '_balances', 'agent_id', 'coupon_expirys',
+        'total_coupons_bid', '_approvals', '_seed_tx_hash', 'use_faith',
+        'max_faith', 'min_faith')
+
+    def __init__(self, xsd_token, usdc_token, uniswap_pair_token, dao, **kwargs):
+        # xSD contract
+        self.xsd_token = xsd_token
+        # USDC contract
+        self.usdc_token = usdc_token
+        # Uniswap pair contract (as an ERC20 for LP shares)
+        self.uniswap_pair_token = uniswap_pair_token
+        # The DAO, for coupon operations
+        self.dao = dao
+
+        # The Ethereum account the agent works from
+        self.address = kwargs['address']
+        # Balances live in struct-of-arrays columns on the Model; the
+        # agent is a view into its own index of them.
+        self._balances = kwargs['balances']
+        self.agent_id = kwargs['agent_id']
+        # Locally tracked next transaction nonce, seeded by the Model in
+        # one startup pass (or fetched lazily) and then incremented per
+        # submission so no write ever waits on eth_getTransactionCount.
+        self._next_nonce = kwargs.get('starting_nonce')
+        # Reusable call/transact kwargs, so hot paths don't allocate a
+        # fresh dict per RPC. web3 can mutate what it's handed, so the
+        # transact template gets copied at the boundary.
+        self._call_kwargs = {'from': self.address, 'gas': 8000000}
+        self._tx_kwargs_template = {'from': self.address, 'gas': 8000000, 'gasPrice': 1}
+
+        # The Model hydrates everyone's balances in one Multicall round
+        # trip at startup and passes them in; fetch them ourselves only if
+        # we weren't given them.
+        starting_lp = kwargs.get('starting_lp')
+        if starting_lp is None:
+            starting_lp = Balance(
+                self.uniswap_pair_token.caller(self._call_kwargs).balanceOf(self.address),
+                UNI_D)
+        starting_xsd = kwargs.get('starting_xsd')
+        if starting_xsd is None:
+            starting_xsd = Balance(
+                self.xsd_token.caller(self._call_kwargs).balanceOf(self.address),
+                XSD_D)
+        starting_usdc = kwargs.get('starting_usdc')
+        if starting_usdc is None:
+            starting_usdc = Balance(
+                self.usdc_token.caller(self._call_kwargs).balanceOf(self.address),
+                USDC_D)
+
+        # Uniswap LP share balance
+        self.lp = starting_lp
+        # xSD balance
+        self.xsd = starting_xsd
+        # USDC balance
+        self.usdc = starting_usdc
+        # Notional ETH balance, spent on epoch advance incentives
+        self.eth = kwargs.get('starting_eth', Balance(0, 18))
+        # Bonded DAO share balance
+        self.xsds = Balance(0, XSDS_D)
+
+        # Transaction hash of our startup USDC seed mint, if any; the
+        # Model confirms all the agents' mints in one parallel pass
+        # instead of each construction blocking on its own.
+        self._seed_tx_hash = None
+        if not kwargs.get('is_seeded', False):
+            # Chain hasn't been seeded yet, so give ourselves some USDC to
+            # start trading with.
+            seed_usdc = kwargs.get('seed_usdc', Balance(0, USDC_D))
+            if seed_usdc > 0:
+                tx = self.tx_kwargs()
+                tx['to'] = self.usdc_token.address
+                tx['data'] = self.usdc_token.encodeABI(
+                    fn_name='mint', args=[self.address, seed_usdc.to_wei()])
+                self._seed_tx_hash = w3.eth.send_transaction(tx)
+                self.usdc = seed_usdc
+
+        # Epochs we have outstanding coupon bids at, sorted so the
+        # redeem path can slice out the epochs that have come due
+        # instead of retrying every epoch we've ever touched.
+        self.coupon_expirys = SortedList()
+        # Total coupons we have ever bid
+        self.total_coupons_bid = Balance(0, XSD_D)
+
+        # One-time token approvals. All four approvals go out in one
+        # burst of back-to-back transactions at construction time instead
+        # of lazily blocking the first trade of each kind.
+        if kwargs.get('is_seeded', False):
+            # A previous run against this chain already approved us.
+            self._approvals = APPROVAL_ALL
+        else:
+            self._approvals = 0
+            self._approve_all()
+
+        # How much the agent believes the system's market cap should be
+        # able to reach, if they pay attention to that sort of thing.
+        self.use_faith = kwargs.get('use_faith', True)
+        self.max_faith = kwargs.get('max_faith', 1000000.0)
+        self.min_faith = kwargs.get('min_faith', 500000.0)
+
+    # The balance attributes index into the Model's SoA columns, so
+    # aggregate queries across agents are single array operations.
+    @property
+    def lp(self):
+        return self._balances['lp'][self.agent_id]
+
+    @lp.setter
+    def lp(self, value):
+        self._balances['lp'][self.agent_id] = value
+
+    @property
+    def xsd(self):
+        return self._balances['xsd'][self.agent_id]
+
+    @xsd.setter
+    def xsd(self, value):
+        self._balances['xsd'][self.agent_id] = value
+
+    @property
+    def usdc(self):
+        return self._balances['usdc'][self.agent_id]
+
+    @usdc.setter
+    def usdc(self, value):
+        self._balances['usdc'][self.agent_id] = value
+
+    @property
+    def eth(self):
+        return self._balances['eth'][self.agent_id]
+
+    @eth.setter
+    def eth(self, value):
+        self._balances['eth'][self.agent_id] = value
+
+    @property
+    def xsds(self):
+        return self._balances['xsds'][self.agent_id]
+
+    @xsds.setter
+    def xsds(self, value):
+        self._balances['xsds'][self.agent_id] = value
+
+    def next_nonce(self):
+        """
+        Get the nonce to use for the agent's next transaction,
+        maintaining it locally instead of asking the node every time.
+        """
+        if self._next_nonce is None:
+            self._next_nonce = get_nonce(self.address)
+        nonce = self._next_nonce
+        self._next_nonce += 1
+        return nonce
+
+    def tx_kwargs(self):
+        """
+        Get transact kwargs for the agent's next transaction, with the
+        nonce filled in.
+        """
+        kwargs = self._tx_kwargs_template.copy()
+        kwargs['nonce'] = self.next_nonce()
+        return kwargs
+
+    def resync_nonce(self):
+        """
+        Forget the locally tracked nonce (e.g. after a failed
+        transaction) so the next one is fetched from the node.
+        """
+        self._next_nonce = None
+
+    def _approve_all(self):
+        """
+        Send every one-time approve() the agent will ever need, as one
+        burst of transactions with locally assigned nonces, so we don't
+        serialize on mining or nonce lookups mid-simulation.
+        """
+        approvals = [
+            (self.usdc_token, UNIV2Router['addr']),
+            (self.xsd_token, UNIV2Router['addr']),
+            (self.uniswap_pair_token, UNIV2Router['addr']),
+            (self.xsd_token, self.dao.contract.address),
+        ]
+        missing = APPROVAL_ALL & ~self._approvals
+        for bit, (token, spender) in zip(
+                (APPROVAL_USDC, APPROVAL_XSD, APPROVAL_UNISWAP, APPROVAL_DAO),
+                approvals):
+            if not missing & bit:
+                continue
+            tx = self.tx_kwargs()
+            tx['to'] = token.address
+            tx['data'] = approve_calldata(token, spender)
+            w3.eth.send_transaction(tx)
+        self._approvals = APPROVAL_ALL
+
+    def __str__(self):
+        return '{}: xSD={} USDC={} LP={} coupons={}'.format(
+            self.address, self.xsd, self.usdc, self.lp, self.total_coupons_bid)
+
+    def get_faith(self, block, price, total_supply):
+        """
+        Get how much xSD market cap the agent believes the market can
+        support at the given block.
+        """
+        return _faith_at_block(block, self.min_faith, self.max_faith)
+
+
+
+class UniswapPool:
+    """
+    Wraps the Uniswap xSD:USDC pair and router for trading and liquidity
+    provision.
+    """
+
+    def __init__(self, uniswap_pair, uniswap_router, uniswap_pair_token, usdc_token, xsd_token):
+        self.uniswap_pair = uniswap_pair
+        self.uniswap_router = uniswap_router
+        self.uniswap_pair_token = uniswap_pair_token
+        self.usdc_token = usdc_token
+        self.xsd_token = xsd_token
+        # Reusable kwargs for the pool's own eth_calls.
+        self._call_kwargs = {'from': self.usdc_token.address, 'gas': 8000000}
+        # token0 is immutable for the life of the pair, so fetch it once.
+        self._token0 = self.uniswap_pair.caller(self._call_kwargs).token0()
+        # Local mirror of the pair's reserves. Kept up to date from the
+        # Swap events of our own trades, so price queries don't need an
+        # RPC; invalidated (and so refetched) when liquidity moves or
+        # when the model decides to reconcile with the chain. Agents
+        # step on threads, so the mirror is guarded by a lock.
+        self._reserves_cache = None
+        # Price derived from the mirror, memoized until the reserves
+        # next move (every reserve-moving path goes through the mirror).
+        self._price_cache = None
+        self._mirror_lock = threading.Lock()
+
+    def operational(self):
+        """
+        Return True if the pool has launched and has liquidity in it.
+        """
+        reserve0, reserve1, _ = self.getReserves()
+        return reserve0 > 0 and reserve1 > 0
+
+    def getToken0(self):
+        """
+        Get the address of the pair's token0.
+        """
+        return self._token0
+
+    def getReserves(self):
+        """
+        Get the pair's (reserve0, reserve1, last block timestamp).
+        """
+        with self._mirror_lock:
+            if self._reserves_cache is None:
+                self._reserves_cache = caller_for(
+                    self.uniswap_pair, self._call_kwargs).getReserves()
+            return self._reserves_cache
+
+    def prime_reserves(self, reserves):
+        """
+        Install reserves fetched elsewhere (e.g. by the model's batched
+        step read) into the mirror, without a round trip of our own.
+        """
+        with self._mirror_lock:
+            self._reserves_cache = tuple(reserves)
+            self._price_cache = None
+
+    def invalidate_reserves(self):
+        """
+        Mark the mirrored reserves stale so the next getReserves refetches.
+        """
+        self._reserves_cache = None
+        self._price_cache = None
+
+    def _apply_swap(self, token_in, amount_in, token_out, amount_out):
+        """
+        Update the mirrored reserves to reflect a swap we just made, so
+        the next price query doesn't need to go back to the chain.
+        """
+        with self._mirror_lock:
+            if self._reserves_cache is None:
+                return
+            reserve0, reserve1, ts = self._reserves_cache
+            if self._token0.lower() == token_in.lower():
+                self._reserves_cache = (reserve0 + amount_in, reserve1 - amount_out, ts)
+            else:
+                self._reserves_cache = (reserve0 - amount_out, reserve1 + amount_in, ts)
+            self._price_cache = None
+
+    def getTokenBalance(self):
+        """
+        Get the (USDC, xSD) Balances held by the pair.
+        """
+        reserve0, reserve1, _ = self.getReserves()
+        token0 = self.getToken0()
+        if token0.lower() == USDC['addr'].lower():
+            return Balance(reserve0, USDC_D), Balance(reserve1, XSD_D)
+        return Balance(reserve1, USDC_D), Balance(reserve0, XSD_D)
+
+    def getInstantaneousPrice(self):
+        """
+        Get the current xSD price in USDC per xSD.
+        """
+        usdc_b, xsd_b = self.getTokenBalance()
+        if float(xsd_b) == 0:
+            return 0
+        return float(usdc_b) / float(xsd_b)
+
+    def xsd_price(self):
+        """
+        Get the current xSD price in USDC. Memoized until the reserves
+        move, since every option filter and log line wants it.
+        """
+        price = self._price_cache
+        if price is None:
+            price = self._price_cache = self.getInstantaneousPrice()
+        return price
+
+    def total_lp(self, agent):
+        """
+        Get the total supply of LP shares.
+        """
+        return Balance(
+            caller_for(self.uniswap_pair_token, agent._call_kwargs).totalSupply(),
+            UNI_D)
+
+    def _swap_amount_out(self, tx_hash, token_out):
+        """
+        Get the atomic amount of token_out that the swap in the given
+        mined transaction paid out, from its Swap event.
+        """
+        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        swap = self.uniswap_pair.events.Swap().processReceipt(receipt)[-1]['args']
+        if self.getToken0().lower() == token_out.lower():
+            return swap['amount0Out']
+        return swap['amount1Out']
+
+    def provide_liquidity(self, agent, xsd, usdc, deadline_ts):
+        """
+        Provide xsd and usdc of liquidity from the given agent.
+        deadline_ts is the current chain timestamp, cached by the caller.
+        """
+        deadline = deadline_ts + DEADLINE_FROM_NOW
+        self.uniswap_router.functions.addLiquidity(
+            self.xsd_token.address,
+            self.usdc_token.address,
+            xsd.to_wei(),
+            usdc.to_wei(),
+            0,
+            0,
+            agent.address,
+            deadline,
+        ).transact(agent.tx_kwargs())
+        self.invalidate_reserves()
+
+    def remove_liquidity(self, agent, lp, min_xsd_amount, min_usdc_amount, deadline_ts):
+        """
+        Remove lp LP shares of liquidity for the given agent.
+        """
+        deadline = deadline_ts + DEADLINE_FROM_NOW
+        self.uniswap_router.functions.removeLiquidity(
+            self.xsd_token.address,
+            self.usdc_token.address,
+            lp.to_wei(),
+            min_xsd_amount.to_wei(),
+            min_usdc_amount.to_wei(),
+            agent.address,
+            deadline,
+        ).transact(agent.tx_kwargs())
+        self.invalidate_reserves()
+
+    def buy(self, agent, usdc, min_xsd_amount, deadline_ts):
+        """
+        Spend the given amount of the agent's USDC on xSD. Return the
+        amount of xSD bought.
+        """
+        deadline = deadline_ts + DEADLINE_FROM_NOW
+        tx_hash = self.uniswap_router.functions.swapExactTokensForTokens(
+            usdc.to_wei(),
+            min_xsd_amount.to_wei(),
+            [self.usdc_token.address, self.xsd_token.address],
+            agent.address,
+            deadline,
+        ).transact(agent.tx_kwargs())
+
+        # The Swap event already says how much we got; no need to probe
+        # balanceOf before and after.
+        amount_out = self._swap_amount_out(tx_hash, self.xsd_token.address)
+        self._apply_swap(self.usdc_token.address, usdc.to_wei(), self.xsd_token.address, amount_out)
+        return Balance(amount_out, XSD_D)
+
+    def sell(self, agent, xsd, min_usdc_amount, deadline_ts):
+        """
+        Sell the given amount of the agent's xSD for USDC. Return the
+        amount of USDC received.
+        """
+        deadline = deadline_ts + DEADLINE_FROM_NOW
+        tx_hash = self.uniswap_router.functions.swapExactTokensForTokens(
+            xsd.to_wei(),
+            min_usdc_amount.to_wei(),
+            [self.xsd_token.address, self.usdc_token.address],
+            agent.address,
+            deadline,
+        ).transact(agent.tx_kwargs())
+
+        amount_out = self._swap_amount_out(tx_hash, self.usdc_token.address)
+        self._apply_swap(self.xsd_token.address, xsd.to_wei(), self.usdc_token.address, amount_out)
+        return Balance(amount_out, USDC_D)
+
+
+class DAO:
+    """
+    Wraps the DAO (the Implementation contract behind the Root proxy) for
+    epoch advancement and coupon operations.
+    """
+
+    def __init__(self, contract, xsd_token):
+        self.contract = contract
+        self.xsd_token = xsd_token
+        # Reusable kwargs for the DAO's own eth_calls.
+        self._call_kwargs = {'from': self.xsd_token.address, 'gas': 8000000}
+
+    def xsd_supply(self):
+        """
+        Get the total xSD supply.
+        """
+        return Balance(
+            caller_for(self.xsd_token, self._call_kwargs).totalSupply(),
+            XSD_D)
+
+    def total_coupons(self):
+        """
+        Get the total number of outstanding coupons.
+        """
+        return Balance(
+            caller_for(self.contract, self._call_kwargs).totalCoupons(),
+            XSD_D)
+
+    def epoch(self, agent):
+        """
+        Get the current DAO epoch.
+        """
+        return caller_for(self.contract, agent._call_kwargs).epoch()
+
+    def advance(self, agent):
+        """
+        Advance the epoch from the given agent, collecting the advance
+        incentive.
+        """
+        self.contract.functions.advance().transact(agent.tx_kwargs())
+
+    def coupon_bid(self, agent, coupon_expiry, xsd_amount, max_coupon_amount):
+        """
+        Burn up to xsd_amount of the agent's xSD on coupons, asking for at
+        most max_coupon_amount coupons, with the agent's chosen expiry.
+        """
+        self.contract.functions.purchaseCoupons(xsd_amount.to_wei()).transact(agent.tx_kwargs())
+
+    def redeem(self, agent, epoch_expired):
+        """
+        Redeem the agent's coupons from the given epoch. Leaves the
+        agent's local balances to be resynced by the caller.
+        """
+        coupons = caller_for(self.contract, agent._call_kwargs).balanceOfCoupons(
+            agent.address, epoch_expired)
+        self.contract.functions.redeemCoupons(epoch_expired, coupons).transact(agent.tx_kwargs())
+
+    def redeem_all(self, agent, epochs_expired):
+        """
+        Redeem the agent's coupons from every given epoch. One
+        Multicall2 aggregate finds which epochs actually hold coupons
+        (falling back to per-epoch reads), and only those epochs get a
+        redeem transaction, sent back-to-back with locally assigned
+        nonces instead of a read-then-write round trip per epoch.
+        Returns the epochs that are settled (redeemed or empty) and so
+        never need to be tried again.
+        """
+        if not epochs_expired:
+            return []
+        calls = [
+            (self.contract.address,
+             bytes.fromhex(self.contract.encodeABI(
+                 fn_name='balanceOfCoupons', args=[agent.address, epoch])[2:]))
+            for epoch in epochs_expired]
+        try:
+            multicall = w3.eth.contract(abi=MULTICALL2_ABI, address=MULTICALL2['addr'])
+            _, return_data = multicall.functions.aggregate(calls).call()
+            coupon_balances = [
+                w3.codec.decode_abi(['uint256'], ret)[0] for ret in return_data]
+        except Exception:
+            coupon_balances = [
+                caller_for(self.contract, agent._call_kwargs).balanceOfCoupons(
+                    agent.address, epoch)
+                for epoch in epochs_expired]
+        settled = []
+        for epoch, coupons in zip(epochs_expired, coupon_balances):
+            if coupons != 0:
+                try:
+                    self.contract.functions.redeemCoupons(
+                        epoch, coupons).transact(agent.tx_kwargs())
+                except Exception:
+                    # Not redeemable yet; leave it for a later pass
+                    agent.resync_nonce()
+                    continue
+            settled.append(epoch)
+        return settled
+
+
+class Model:
+    """
+    Holds the whole simulation: the pool, the DAO, and all the agents.
+    """
+
+    def __init__(self, dao, uniswap, usdc_token, xsd_token, uniswap_pair_token, uniswap_router, agent_addresses, **kwargs):
+        self.dao = dao
+        self.uniswap = uniswap
+        self.usdc_token = usdc_token
+        self.xsd_token = xsd_token
+        self.uniswap_pair_token = uniswap_pair_token
+        self.uniswap_router = uniswap_router
+        self.agents = []
+        # Block number as of the last step() (ganache only mines when we
+        # transact, so this stays valid between our own transactions).
+        self._block_no = w3.eth.block_number
+
+        # Latest chain timestamp, refreshed once per step for Uniswap
+        # transaction deadlines.
+        self.current_timestamp = w3.eth.get_block('latest')['timestamp']
+        # Worker threads that step agents concurrently within a block.
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=16)
+
+        # Upper bounds on what agents start with
+        self.max_eth = Balance.from_tokens(100000, 18)
+        self.max_usdc = Balance.from_tokens(100000, USDC_D)
+
+        # Agent balances are stored struct-of-arrays: one column per
+        # field, one row per agent, with Agent objects as thin views.
+        # Object arrays of Balance keep 256-bit amounts exact.
+        self.agent_balances = {
+            field: np.empty(len(agent_addresses), dtype=object)
+            for field in ('lp', 'xsd', 'usdc', 'eth', 'xsds')}
+
+        # If the pool is already operating we've been run against this
+        # chain before and everyone's balances are real.
+        is_seeded = self.uniswap.operational()
+
+        # Hydrate every agent's (LP, xSD, USDC) balances in one Multicall
+        # round trip instead of 3 eth_calls per agent.
+        prefetched = self._fetch_all_balances(agent_addresses)
+
+        # Seed every agent's local nonce counter up front, so the write
+        # paths never ask the node for eth_getTransactionCount again
+        # (the counters only resync after a failed transaction).
+        nonces = get_nonces(agent_addresses)
+
+        # Draw everyone's starting-balance fractions in two vectorized
+        # calls instead of two Python RNG calls per agent.
+        rng = np.random.default_rng(kwargs.pop('seed', None))
+        eth_draws = rng.random(len(agent_addresses))
+        usdc_draws = rng.random(len(agent_addresses))
+
+        for agent_id, address in enumerate(agent_addresses):
+            start_lp, start_xsd, start_usdc = prefetched[address]
+            agent = Agent(
+                xsd_token,
+                usdc_token,
+                uniswap_pair_token,
+                dao,
+                address=address,
+                balances=self.agent_balances,
+                agent_id=agent_id,
+                starting_lp=start_lp,
+                starting_xsd=start_xsd,
+                starting_usdc=start_usdc,
+                starting_nonce=nonces[address],
+                starting_eth=self.max_eth * float(eth_draws[agent_id]),
+                seed_usdc=self.max_usdc * float(usdc_draws[agent_id]),
+                is_seeded=is_seeded,
+                **kwargs)
+            self.agents.append(agent)
+
+        # Confirm every agent's seed mint in one parallel pass, now
+        # that the whole burst has been submitted.
+        seed_hashes = [a._seed_tx_hash for a in self.agents
+                       if a._seed_tx_hash is not None]
+        if seed_hashes:
+            list(self._executor.map(
+                w3.eth.wait_for_transaction_receipt, seed_hashes))
+
+        # Per-agent strategy parameters, packed into arrays so a block's
+        # strategy weights compute as one vectorized expression.
+        self._max_faith = np.array([a.max_faith for a in self.agents])
+        self._min_faith = np.array([a.min_faith for a in self.agents])
+        self._use_faith = np.array([a.use_faith for a in self.agents])
+
+    def _fetch_all_balances(self, agent_addresses):
+        """
+        Fetch every agent's (LP, xSD, USDC) balances. Uses the migrated
+        Multicall2 to do it in one round trip; falls back to individual
+        eth_calls if Multicall isn't deployed on this chain.
+        """
+        calls = []
+        for address in agent_addresses:
+            for token in (self.uniswap_pair_token, self.xsd_token, self.usdc_token):
+                calldata = token.encodeABI(fn_name='balanceOf', args=[address])
+                calls.append((token.address, bytes.fromhex(calldata[2:])))
+
+        try:
+            multicall = w3.eth.contract(abi=MULTICALL2_ABI, address=MULTICALL2['addr'])
+            _, return_data = multicall.functions.aggregate(calls).call()
+            raw_balances = [w3.codec.decode_abi(['uint256'], ret)[0] for ret in return_data]
+        except Exception:
+            # No Multicall here; eat the 3N round trips.
+            raw_balances = [
+                int(w3.eth.call({'to': target, 'data': calldata}).hex(), 16)
+                for (target, calldata) in calls]
+
+        prefetched = {}
+        balances = iter(raw_balances)
+        for address in agent_addresses:
+            prefetched[address] = (
+                Balance(next(balances), UNI_D),
+                Balance(next(balances), XSD_D),
+                Balance(next(balances), USDC_D),
+            )
+        return prefetched
+
+    def _fetch_step_state(self):
+        """
+        Fetch the globals a step needs (pair reserves, xSD supply, total
+        coupons, current epoch) in one Multicall2 aggregate instead of
+        four separate eth_calls. Primes the pool's reserve mirror from
+        the fetched reserves, so price queries this step stay local.
+        Falls back to the individual getters if Multicall isn't deployed.
+        """
+        calls = [
+            (self.uniswap.uniswap_pair.address,
+             bytes.fromhex(self.uniswap.uniswap_pair.encodeABI(fn_name='getReserves')[2:])),
+            (self.xsd_token.address,
+             bytes.fromhex(self.xsd_token.encodeABI(fn_name='totalSupply')[2:])),
+            (self.dao.contract.address,
+             bytes.fromhex(self.dao.contract.encodeABI(fn_name='totalCoupons')[2:])),
+            (self.dao.contract.address,
+             bytes.fromhex(self.dao.contract.encodeABI(fn_name='epoch')[2:])),
+        ]
+        try:
+            multicall = w3.eth.contract(abi=MULTICALL2_ABI, address=MULTICALL2['addr'])
+            _, return_data = multicall.functions.aggregate(calls).call()
+            self.uniswap.prime_reserves(
+                w3.codec.decode_abi(['uint112', 'uint112', 'uint32'], return_data[0]))
+            supply = Balance(
+                w3.codec.decode_abi(['uint256'], return_data[1])[0], XSD_D)
+            coupons = Balance(
+                w3.codec.decode_abi(['uint256'], return_data[2])[0], XSD_D)
+            epoch = w3.codec.decode_abi(['uint256'], return_data[3])[0]
+        except Exception:
+            # No Multicall here; eat the four round trips.
+            self.uniswap.invalidate_reserves()
+            supply = self.dao.xsd_supply()
+            coupons = self.dao.total_coupons()
+            epoch = self.dao.epoch(self.agents[0])
+        usdc_b, xsd_b = self.uniswap.getTokenBalance()
+        return {
+            'price': self.uniswap.xsd_price(),
+            'supply': supply,
+            'coupons': coupons,
+            'epoch': epoch,
+            'usdc_b': usdc_b,
+            'xsd_b': xsd_b,
+        }
+
+    def get_overall_faith(self):
+        """
+        Get the faith value all the agents share right now.
+        """
+        return self.agents[0].get_faith(
+            self._block_no,
+            self.uniswap.xsd_price(),
+            self.dao.xsd_supply())
+
+    def log(self, stream, seleted_advancer, cached_state, header=False):
+        """
+        Log a TSV line of overall simulation state to the given stream,
+        reusing the globals the step's batched read already fetched
+        instead of re-querying each of them.
+        """
+        if header:
+            stream.write('#block\tepoch\tprice\tsupply\tcoupons\tfaith\n')
+        stream.write('{}\t{}\t{:.2f}\t{}\t{}\t{:.2f}\n'.format(
+            self._block_no,
+            cached_state['epoch'],
+            cached_state['price'],
+            cached_state['supply'],
+            cached_state['coupons'],
+            self.agents[0].get_faith(
+                self._block_no, cached_state['price'], cached_state['supply'])))
+
+    def _strategy_weights(self, block, price, total_supply):
+        """
+        Compute the (num agents) x (num actions) strategy weight matrix
+        for this block in one vectorized pass.
+        """
+        # TODO: real (learned?) strategies
+        weights = np.ones((len(self.agents), len(ACTIONS)))
+        if price > 1.0:
+            # Expansion: back the system
+            weights[:, ACTION_INDEX['buy']] = 2.0
+            weights[:, ACTION_INDEX['provide_liquidity']] = 2.0
+        else:
+            # Contraction: bid on coupons, get out of the way
+            weights[:, ACTION_INDEX['coupon_bid']] = 2.0
+            weights[:, ACTION_INDEX['sell']] = 2.0
+
+        # Agents who track the system market cap sell down to their
+        # faith in it when there is too much xSD out there.
+        center_faith = (self._max_faith + self._min_faith) / 2
+        swing_faith = (self._max_faith - self._min_faith) / 2
+        faith = center_faith + swing_faith * _SIN_TABLE[block % 5000]
+        too_much_xsd = self._use_faith & (price * float(total_supply) > faith)
+        weights[:, ACTION_INDEX['sell']] = np.where(
+            too_much_xsd, 10.0, weights[:, ACTION_INDEX['sell']])
+        weights[:, ACTION_INDEX['remove_liquidity']] = np.where(
+            too_much_xsd, 2.0, weights[:, ACTION_INDEX['remove_liquidity']])
+        return weights
+
+    def step(self):
+        """
+        Run one simulated block: advance the epoch from a random agent,
+        then let every agent take one action. Returns the agent that
+        advanced the epoch and the step's fetched global state.
+        """
+        latest_block = w3.eth.get_block('latest')
+        block = self._block_no = latest_block["number"]
+        # Chain time only moves when a transaction mines, so one timestamp
+        # fetch per step is good enough for every Uniswap deadline in it.
+        self.current_timestamp = latest_block['timestamp']
+        logger.debug('block: %s', block)
+
+        # Pick someone to advance the epoch for the incentive.
+        seleted_advancer = self.agents[random.randrange(len(self.agents))]
+        try:
+            self.dao.advance(seleted_advancer)
+        except Exception as inst:
+            logger.warning('agent=%s action=advance error=%s',
+                           seleted_advancer.address, inst)
+
+        # One aggregated eth_call fetches every global the rest of the
+        # step reads (and reconciles the reserve mirror with the chain,
+        # in case it has drifted).
+        state = self._fetch_step_state()
+        current_epoch = state['epoch']
+
+        # One strategy evaluation covers every agent this block.
+        strategy_weights = self._strategy_weights(
+            block, state['price'], state['supply'])
+
+        # Whether the pool can trade and what the price is are
+        # loop-invariant for the decision phase, so evaluate them once
+        # here instead of once per agent.
+        pool_operational = self.uniswap.operational()
+
+        # Independent agent actions mostly just wait on RPC, so overlap
+        # them across threads; shared pool state is behind a lock.
+        list(self._executor.map(
+            lambda pair: self._step_agent(
+                pair[0], pair[1], block, current_epoch, strategy_weights,
+                pool_operational, state['price']),
+            enumerate(self.agents)))
+
+        return seleted_advancer, state
+
+    def _step_agent(self, agent_num, a, block, current_epoch, strategy_weights,
+                    pool_operational, price):
+        """
+        Let one agent pick and perform one action for this block.
+        """
+        # Pack eligibility over the fixed ACTIONS vocabulary into one
+        # bitmask (bit order matches ACTIONS) and look the weight vector
+        # up in the precomputed table; weighting and sampling then stay
+        # in NumPy instead of rebuilding an options list and a
+        # random.choices cumulative table per agent.
+        has_usdc = a.usdc > 0
+        has_xsd = a.xsd > 0
+        mask = ((has_usdc and pool_operational)
+                | (has_xsd and pool_operational) << 1
+                | has_xsd << 2
+                | (len(a.coupon_expirys) > 0) << 3
+                | (has_usdc and has_xsd) << 4
+                | (a.lp > 0) << 5)
+        if mask == 0:
+            # Nothing to do
+            return
+
+        weights = strategy_weights[agent_num] * _ELIGIBILITY[mask]
+        cumulative = np.cumsum(weights)
+        if cumulative[-1] == 0:
+            return
+        action = ACTIONS[np.searchsorted(
+            cumulative, random.random() * cumulative[-1], side='right')]
+
+        # What fraction of the relevant balance to commit to the
+        # action.
+        commitment = random.random() * 0.1
+
+        logger.debug('agent=%s action=%s price=%s', agent_num, action, price)
+
+        try:
+            if action == 'buy':
+                usdc_in = portion_dedusted(a.usdc, commitment)
+                usdc_b, xsd_b = self.uniswap.getTokenBalance()
+                # Quote locally from the mirrored reserves instead of
+                # round-tripping router.getAmountsOut, and tolerate a
+                # bit of slippage from other agents. The wei values go
+                # in as floats: the jitted helper can't take ints past
+                # 2**63, which 18-decimal reserves exceed immediately.
+                min_xsd_amount = Balance(
+                    _v2_amount_out(float(usdc_in.to_wei()),
+                                   float(usdc_b.to_wei()),
+                                   float(xsd_b.to_wei())),
+                    XSD_D) * 0.9
+                xsd_bought = self.uniswap.buy(a, usdc_in, min_xsd_amount, self.current_timestamp)
+                a.usdc = a.usdc - usdc_in
+                a.xsd = a.xsd + xsd_bought
+            elif action == 'sell':
+                xsd_out = portion_dedusted(a.xsd, commitment)
+                usdc_b, xsd_b = self.uniswap.getTokenBalance()
+                min_usdc_amount = Balance(
+                    _v2_amount_out(float(xsd_out.to_wei()),
+                                   float(xsd_b.to_wei()),
+                                   float(usdc_b.to_wei())),
+                    USDC_D) * 0.9
+                usdc_got = self.uniswap.sell(a, xsd_out, min_usdc_amount, self.current_timestamp)
+                a.xsd = a.xsd - xsd_out
+                a.usdc = a.usdc + usdc_got
+            elif action == 'coupon_bid':
+                xsd_at_risk = portion_dedusted(a.xsd, commitment)
+                rand_epoch_expiry = random.randrange(10000000)
+                # Up to 10x the xSD at risk, scaled directly in wei
+                # rather than via Decimal token-unit round trips.
+                rand_max_coupons = int(xsd_at_risk.raw * (random.random() * 10))
+                self.dao.coupon_bid(a, rand_epoch_expiry, xsd_at_risk, rand_max_coupons)
+                a.coupon_expirys.add(current_epoch + rand_epoch_expiry)
+                a.total_coupons_bid = a.total_coupons_bid + xsd_at_risk
+                a.xsd = a.xsd - xsd_at_risk
+            elif action == 'redeem':
+                balance_before = Balance(
+                    caller_for(self.xsd_token, a._call_kwargs).balanceOf(a.address),
+                    XSD_D)
+                # Only the epochs that have come due can possibly
+                # redeem; irange slices them out of the sorted list
+                # without touching the future ones.
+                candidates = list(a.coupon_expirys.irange(maximum=current_epoch))
+                for epoch in self.dao.redeem_all(a, candidates):
+                    a.coupon_expirys.remove(epoch)
+                balance_after = Balance(
+                    caller_for(self.xsd_token, a._call_kwargs).balanceOf(a.address),
+                    XSD_D)
+                a.xsd = a.xsd + (balance_after - balance_before)
+            elif action == 'provide_liquidity':
+                usdc_b, xsd_b = self.uniswap.getTokenBalance()
+                usdc = portion_dedusted(a.usdc, commitment)
+                if float(xsd_b) > 0 and float(usdc_b) > 0:
+                    # router.quote is just amountA * reserveB / reserveA,
+                    # so compute it from the mirrored reserves.
+                    xsd_needed = Balance(
+                        usdc.to_wei() * xsd_b.to_wei() // usdc_b.to_wei(),
+                        XSD_D)
+                else:
+                    # Starting price is 1 xSD = 1 USDC
+                    xsd_needed = usdc.to_decimals(XSD_D)
+                if a.xsd < xsd_needed:
+                    return
+                self.uniswap.provide_liquidity(a, xsd_needed, usdc, self.current_timestamp)
+                # The router pulls exactly the quoted amounts at the
+                # quoted ratio, so debit them locally instead of
+                # re-reading the pair; the next step's batched reserve
+                # read corrects any rounding drift.
+                a.xsd = a.xsd - xsd_needed
+                a.usdc = a.usdc - usdc
+                a.lp = Balance(
+                    caller_for(self.uniswap_pair_token, a._call_kwargs).balanceOf(a.address),
+                    UNI_D)
+            elif action == 'remove_liquidity':
+                lp = portion_dedusted(a.lp, commitment)
+                total_lp = self.uniswap.total_lp(a)
+                usdc_b, xsd_b = self.uniswap.getTokenBalance()
+                # Pro-rata share and the 10% slippage allowance in exact
+                # raw integer math, instead of bouncing each term
+                # through float and Decimal.
+                xsd_out = Balance(
+                    xsd_b.raw * lp.raw // total_lp.raw, XSD_D)
+                usdc_out = Balance(
+                    usdc_b.raw * lp.raw // total_lp.raw, USDC_D)
+                min_xsd_amount = Balance(xsd_out.raw * 9 // 10, XSD_D)
+                min_usdc_amount = Balance(usdc_out.raw * 9 // 10, USDC_D)
+                self.uniswap.remove_liquidity(a, lp, min_xsd_amount, min_usdc_amount, self.current_timestamp)
+                a.lp = a.lp - lp
+                # Credit the pro-rata share we computed above rather
+                # than re-reading the pair; the next step's batched
+                # reserve read corrects any rounding drift.
+                a.xsd = a.xsd + xsd_out
+                a.usdc = a.usdc + usdc_out
+        except Exception as inst:
+            # Probably a revert; log it, resync the nonce in case the
+            # transaction never made it in, and keep simulating
+            a.resync_nonce()
+            logger.warning('agent=%s action=%s error=%s', agent_num, action, inst)
+
+
+
+def main():
+    """
+    Main function: run the model against the local chain forever.
+
+    Set XSD_REPLICA_PORTS to a comma-separated list of ganache ports
+    (each with the protocol already migrated onto it) to instead run
+    one independent replicate of the simulation per port, in parallel
+    worker processes, each writing its own log_<port>.tsv.
+    """
+    logging.basicConfig(level=logging.INFO)
+
+    replica_ports = os.environ.get('XSD_REPLICA_PORTS')
+    if replica_ports:
+        workers = []
+        for port in replica_ports.split(','):
+            env = dict(
+                os.environ,
+                XSD_RPC_URL='http://localhost:{}'.format(port),
+                XSD_LOG='log_{}.tsv'.format(port))
+            env.pop('XSD_REPLICA_PORTS')
+            workers.append(subprocess.Popen([sys.executable, __file__], env=env))
+        sys.exit(max(worker.wait() for worker in workers))
+
+    logger.info('%s', provider)
+
+    max_accounts = 20
+
+    dao_contract = w3.eth.contract(abi=load_abi(IMPLEMENTATION_JSON_PATH)['abi'], address=xSDS['addr'])
+    xsd_token = w3.eth.contract(abi=load_abi(DOLLAR_JSON_PATH)['abi'], address=xSD['addr'])
+    usdc_token = w3.eth.contract(abi=load_abi(TESTNET_USDC_JSON_PATH)['abi'], address=USDC['addr'])
+    uniswap_pair = w3.eth.contract(abi=load_abi(UNISWAP_PAIR_JSON_PATH)['abi'], address=UNI['addr'])
+    uniswap_pair_token = w3.eth.contract(abi=load_abi(UNISWAP_ERC20_JSON_PATH)['abi'], address=UNI['addr'])
+    uniswap_router = w3.eth.contract(abi=load_abi(UNISWAP_ROUTER_JSON_PATH)['abi'], address=UNIV2Router['addr'])
+
+    dao = DAO(dao_contract, xsd_token)
+    uniswap = UniswapPool(uniswap_pair, uniswap_router, uniswap_pair_token, usdc_token, xsd_token)
+
+    model = Model(
+        dao,
+        uniswap,
+        usdc_token,
+        xsd_token,
+        uniswap_pair_token,
+        uniswap_router,
+        w3.eth.accounts[:max_accounts])
+
+    # Big buffer so TSV lines batch up instead of hitting the disk per
+    # iteration; flushed periodically below.
+    stream = open(os.environ.get('XSD_LOG', 'log.tsv'), 'w', buffering=1 << 16)
+    model.log(stream, model.agents[0], model._fetch_step_state(), header=True)
+
+    # Sample the TSV every few blocks rather than every block; the
+    # interesting dynamics play out over epochs, not single actions.
+    log_every = 10
+
+    for i in range(50000):
+        start = time.time()
+        seleted_advancer, state = model.step()
+        if i % log_every == 0:
+            model.log(stream, seleted_advancer, state)
+        if i % 100 == 0:
+            stream.flush()
+        end = time.time()
+        logger.info('iter: %s, sys time %s', i, end - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1046 @@
+#!/usr/bin/env python3
+
+"""
+pure_model.py: agent-based model of the ESD economy, with no chain
+behind it.
+
+Everything here is plain Python floats and dicts standing in for the
+protocol's fixed-point math: a constant-product Uniswap pool, a DAO
+that advances epochs, expands supply to bonded holders, and sells
+coupons during contractions, and a population of agents with balances
+and (optionally) faith in the system's market cap. It runs many orders
+of magnitude faster than the on-chain model in model.py, at the cost of
+abstracting away the protocol's actual integer math and gas dynamics.
+
+Agent balances are kept as struct-of-arrays NumPy columns on the Model
+(one array per balance kind, one slot per agent), with the Agent
+objects as thin views into their own index, so eligibility tests and
+aggregate statistics can run as bulk array operations instead of
+per-object attribute chasing.
+"""
+
+import concurrent.futures
+import math
+import random
+import time
+from random import random as _rand
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    # Numba is optional; without it the kernels run as plain Python.
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrap(func):
+            return func
+        return wrap
+
+# Number of agents to simulate
+N_AGENTS = 20
+
+# Blocks between epoch advances
+EPOCH_BLOCKS = 10
+
+# Epochs after which an unredeemed coupon expires
+COUPON_EXPIRY = 90
+
+# Slots in the coupon ring buffers. Epochs from (epoch - COUPON_EXPIRY)
+# through the current epoch are all live, so the ring needs one slot
+# more than the expiry window.
+COUPON_SLOTS = COUPON_EXPIRY + 1
+
+# All the actions an agent can take, in canonical order.
+ACTIONS = ('buy', 'sell', 'advance', 'bond', 'unbond', 'coupon', 'redeem',
+           'deposit', 'withdraw')
+ACTION_INDEX = {name: index for index, name in enumerate(ACTIONS)}
+
+# All 512 possible action-eligibility bitmasks (bit order matching
+# ACTIONS), pre-expanded to 0/1 weight vectors, so masking the weight
+# matrix is one table gather instead of stacking nine bool arrays.
+_ELIGIBILITY = np.array(
+    [[(mask >> index) & 1 for index in range(len(ACTIONS))]
+     for mask in range(1 << len(ACTIONS))],
+    dtype=np.float64)
+
+
+def _build_strategy_table():
+    """
+    Build the strategy weight rows for the four regimes an agent can
+    find the market in: regime id = (price above peg) << 1 | (market
+    cap past the agent's faith). Strategy depends on nothing else, so
+    the rows are built once at module load and step indexes them.
+    """
+    table = np.ones((4, len(ACTIONS)))
+    for regime in range(4):
+        row = table[regime]
+        if regime & 2:
+            # Expansion: back the system
+            row[ACTION_INDEX['buy']] = 2.0
+            row[ACTION_INDEX['bond']] = 2.0
+            row[ACTION_INDEX['deposit']] = 2.0
+        else:
+            # Contraction: buy coupons, get out of the way
+            row[ACTION_INDEX['coupon']] = 2.0
+            row[ACTION_INDEX['sell']] = 2.0
+        # Redemption is always worth doing when it's possible.
+        row[ACTION_INDEX['redeem']] = 100.0
+        if regime & 1:
+            # Agents who track the system market cap sell down to
+            # their faith in it when there is too much ESD out there.
+            row[ACTION_INDEX['sell']] = 10.0
+            row[ACTION_INDEX['unbond']] = 2.0
+            row[ACTION_INDEX['withdraw']] = 2.0
+    return table
+
+
+_STRATEGIES = _build_strategy_table()
+
+# The per-block log row layout, with the bound format method cached
+# so log_line pays no spec parsing or attribute lookup per row.
+_LOG_LINE = '{}\t{}\t{:.2f}\t{:.2f}\t{:.2f}\t{:.2f}\n'.format
+
+# The faith sine has a 5000-block period, so one period is tabulated
+# here and get_overall_faith indexes it by block -- no per-block trig
+# and no drift, for 40 KB of table.
+_SIN_TABLE = np.sin(np.arange(5000) * (2 * math.pi / 5000))
+
+
+@njit(cache=True)
+def portion_dedusted(total, fraction):
+    """
+    Compute the amount of an asset to use, given the total held and the
+    fraction the agent wants to commit, without leaving dust behind.
+    """
+    portion = fraction * total
+    return total if total - portion <= 1.0 else portion
+
+
+@njit(cache=True)
+def _pool_deposit(esd, usdc, total_shares, esd_in, usdc_in):
+    """
+    Constant-product deposit math. Returns the LP shares minted.
+    """
+    if total_shares == 0:
+        return usdc_in
+    # With price = usdc/esd, the pool's held value esd*price + usdc
+    # collapses to 2*usdc, and the deposit's value needs one divide.
+    return total_shares * (esd_in * usdc / esd + usdc_in) / (2 * usdc)
+
+
+@njit(cache=True)
+def _pool_withdraw(esd, usdc, total_shares, shares):
+    """
+    Constant-product withdrawal math. Returns the new reserves and
+    share total, and the amounts withdrawn.
+    """
+    portion = shares / total_shares
+    esd_out = esd * portion
+    usdc_out = usdc * portion
+    # Plain subtract-and-clamp instead of max() calls; the negative
+    # case is rounding error, and this is the form the JIT lowers best.
+    esd -= esd_out
+    if esd < 0:
+        esd = 0.0
+    usdc -= usdc_out
+    if usdc < 0:
+        usdc = 0.0
+    total_shares -= shares
+    if total_shares < 0:
+        total_shares = 0.0
+    return esd, usdc, total_shares, esd_out, usdc_out
+
+
+@njit(cache=True)
+def _pool_buy(esd, usdc, k, usdc_in):
+    """
+    Constant-product swap math for a buy. Returns the new reserves and
+    the ESD bought.
+    """
+    new_usdc = usdc + usdc_in
+    new_esd = k / new_usdc
+    return new_esd, new_usdc, esd - new_esd
+
+
+@njit(cache=True)
+def _pool_sell(esd, usdc, k, esd_in):
+    """
+    Constant-product swap math for a sell. Returns the new reserves and
+    the USDC received.
+    """
+    new_esd = esd + esd_in
+    new_usdc = k / new_esd
+    return new_esd, new_usdc, usdc - new_usdc
+
+
+@njit(cache=True)
+def _dao_bond(total_bonded, total_esds, esd):
+    """
+    Bonding share math. Returns the ESDS shares minted.
+    """
+    if total_esds == 0 or total_bonded == 0:
+        return esd
+    return total_esds * esd / total_bonded
+
+
+@njit(cache=True)
+def _dao_unbond(total_bonded, total_esds, esds):
+    """
+    Unbonding share math. Returns the ESD released.
+    """
+    if total_esds == 0:
+        return 0.0
+    return total_bonded * esds / total_esds
+
+
+@njit(cache=True)
+def _step_kernel(actions, commitments, totals,
+                 esd_b, usdc_b, esds_b, eth_b, lp_b,
+                 coupon_underlying, coupon_premium, has_coupons,
+                 supply_underlying, supply_premium,
+                 total_underlying, total_premium,
+                 pool_esd, pool_usdc, pool_shares, pool_k,
+                 epoch, epoch_block, expanding,
+                 esd_supply, total_bonded, total_esds,
+                 interest, advance_reward, fee, block):
+    """
+    Fused action-dispatch loop over the struct-of-arrays state: the
+    whole per-agent body of Model.step in one JIT-compiled pass, with
+    the pool and DAO scalars threaded through as locals and returned
+    at the end. Must mirror the narrated Python loop in Model.step
+    exactly; that loop remains the verbose/reference path.
+    """
+    advanced = False
+    for i in range(actions.shape[0]):
+        if totals[i] == 0.0:
+            # Nothing to do
+            continue
+
+        if pool_esd > 0.0 and pool_usdc > 0.0:
+            price = pool_usdc / pool_esd
+        else:
+            price = 1.0
+        action = actions[i]
+        commitment = commitments[i]
+
+        if action == 0:  # buy
+            usdc = portion_dedusted(usdc_b[i], commitment)
+            new_usdc = pool_usdc + usdc
+            new_esd = pool_k / new_usdc
+            esd_b[i] += pool_esd - new_esd
+            usdc_b[i] -= usdc
+            pool_esd = new_esd
+            pool_usdc = new_usdc
+        elif action == 1:  # sell
+            esd = portion_dedusted(esd_b[i], commitment)
+            new_esd = pool_esd + esd
+            new_usdc = pool_k / new_esd
+            usdc_b[i] += pool_usdc - new_usdc
+            esd_b[i] -= esd
+            pool_esd = new_esd
+            pool_usdc = new_usdc
+        elif action == 2:  # advance
+            # Re-check between agents: the first advance this block
+            # consumes the epoch, so later sampled advances are
+            # illegal even though they were eligible at block start.
+            if epoch != -1 and block - epoch_block < EPOCH_BLOCKS:
+                continue
+            eth_b[i] -= fee
+            epoch += 1
+            epoch_block = block
+            slot = epoch % COUPON_SLOTS
+            total_underlying -= supply_underlying[slot]
+            if total_underlying < 0.0:
+                total_underlying = 0.0
+            total_premium -= supply_premium[slot]
+            if total_premium < 0.0:
+                total_premium = 0.0
+            supply_underlying[slot] = 0.0
+            supply_premium[slot] = 0.0
+            for j in range(coupon_underlying.shape[0]):
+                coupon_underlying[j, slot] = 0.0
+                coupon_premium[j, slot] = 0.0
+                # The cleared slot may have held the agent's last
+                # coupons; refresh the holding flag.
+                held = False
+                for s in range(COUPON_SLOTS):
+                    if coupon_underlying[j, s] != 0.0:
+                        held = True
+                        break
+                has_coupons[j] = held
+            expanding = price > 1.0
+            if expanding and total_bonded > 0.0:
+                expansion = esd_supply * interest
+                total_bonded += expansion
+                esd_supply += expansion
+            esd_supply += advance_reward
+            esd_b[i] += advance_reward
+            advanced = True
+        elif action == 3:  # bond
+            esd = portion_dedusted(esd_b[i], commitment)
+            new_esds = _dao_bond(total_bonded, total_esds, esd)
+            total_bonded += esd
+            total_esds += new_esds
+            esds_b[i] += new_esds
+            esd_b[i] -= esd
+        elif action == 4:  # unbond
+            esds = portion_dedusted(esds_b[i], commitment)
+            esd = _dao_unbond(total_bonded, total_esds, esds)
+            total_bonded -= esd
+            if total_bonded < 0.0:
+                total_bonded = 0.0
+            total_esds -= esds
+            if total_esds < 0.0:
+                total_esds = 0.0
+            esd_b[i] += esd
+            esds_b[i] -= esds
+        elif action == 5:  # coupon
+            esd = portion_dedusted(esd_b[i], commitment)
+            premium_rate = (1.0 - price) / 2.0
+            if premium_rate > 0.4:
+                premium_rate = 0.4
+            elif premium_rate < 0.0:
+                premium_rate = 0.0
+            premium = esd * premium_rate
+            slot = epoch % COUPON_SLOTS
+            supply_underlying[slot] += esd
+            supply_premium[slot] += premium
+            total_underlying += esd
+            total_premium += premium
+            coupon_underlying[i, slot] += esd
+            coupon_premium[i, slot] += premium
+            has_coupons[i] = True
+            esd_supply -= esd
+            if esd_supply < 0.0:
+                esd_supply = 0.0
+            esd_b[i] -= esd
+        elif action == 6:  # redeem
+            total = 0.0
+            for s in range(COUPON_SLOTS):
+                u = coupon_underlying[i, s]
+                p = coupon_premium[i, s]
+                total += u + p
+                total_underlying -= u
+                total_premium -= p
+                supply_underlying[s] -= u
+                if supply_underlying[s] < 0.0:
+                    supply_underlying[s] = 0.0
+                supply_premium[s] -= p
+                if supply_premium[s] < 0.0:
+                    supply_premium[s] = 0.0
+                coupon_underlying[i, s] = 0.0
+                coupon_premium[i, s] = 0.0
+            if total_underlying < 0.0:
+                total_underlying = 0.0
+            if total_premium < 0.0:
+                total_premium = 0.0
+            has_coupons[i] = False
+            esd_supply += total
+            esd_b[i] += total
+        elif action == 7:  # deposit
+            usdc = portion_dedusted(usdc_b[i], commitment)
+            esd = usdc / price
+            if esd_b[i] < esd:
+                continue
+            new_shares = _pool_deposit(
+                pool_esd, pool_usdc, pool_shares, esd, usdc)
+            pool_esd += esd
+            pool_usdc += usdc
+            pool_shares += new_shares
+            pool_k = pool_esd * pool_usdc
+            lp_b[i] += new_shares
+            esd_b[i] -= esd
+            usdc_b[i] -= usdc
+        elif action == 8:  # withdraw
+            lp = portion_dedusted(lp_b[i], commitment)
+            if pool_shares > 0.0:
+                pool_esd, pool_usdc, pool_shares, esd, usdc = _pool_withdraw(
+                    pool_esd, pool_usdc, pool_shares, lp)
+                pool_k = pool_esd * pool_usdc
+            else:
+                esd = 0.0
+                usdc = 0.0
+            lp_b[i] -= lp
+            esd_b[i] += esd
+            usdc_b[i] += usdc
+
+    return (pool_esd, pool_usdc, pool_shares, pool_k,
+            epoch, epoch_block, expanding,
+            esd_supply, total_bonded, total_esds,
+            total_underlying, total_premium, advanced)
+
+
+class UniswapPool:
+    """
+    A constant-product ESD:USDC pool, with LP shares.
+    """
+
+    def __init__(self):
+        # ESD reserve
+        self.esd = 0.0
+        # USDC reserve
+        self.usdc = 0.0
+        # Outstanding LP shares
+        self.total_shares = 0.0
+        # Price memoized until the reserves next move; only the four
+        # reserve-mutating methods invalidate it.
+        self._price = None
+        # Constant-product invariant. Swaps preserve it (the model
+        # charges no fee), so only liquidity moves recompute it.
+        self.k = 0.0
+
+    def operational(self):
+        """
+        Return True if the pool has launched and has liquidity in it.
+        """
+        return self.esd > 0 and self.usdc > 0
+
+    def esd_price(self):
+        """
+        Get the current ESD price in USDC. Memoized until the reserves
+        move, since it's asked for several times per agent per block.
+        """
+        price = self._price
+        if price is None:
+            if self.operational():
+                price = self.usdc / self.esd
+            else:
+                price = 1.0
+            self._price = price
+        return price
+
+    def deposit(self, esd, usdc):
+        """
+        Deposit the given amounts into the pool. Returns the number of
+        LP shares minted.
+        """
+        new_shares = _pool_deposit(
+            self.esd, self.usdc, self.total_shares, esd, usdc)
+        self.esd += esd
+        self.usdc += usdc
+        self.total_shares += new_shares
+        self.k = self.esd * self.usdc
+        self._price = None
+        return new_shares
+
+    def withdraw(self, shares):
+        """
+        Redeem the given LP shares. Returns the (esd, usdc) withdrawn.
+        """
+        if self.total_shares == 0:
+            return 0.0, 0.0
+        self.esd, self.usdc, self.total_shares, esd_out, usdc_out = (
+            _pool_withdraw(self.esd, self.usdc, self.total_shares, shares))
+        self.k = self.esd * self.usdc
+        self._price = None
+        return esd_out, usdc_out
+
+    def buy(self, usdc_in):
+        """
+        Spend the given USDC on ESD. Returns the ESD bought.
+        """
+        self.esd, self.usdc, esd_out = _pool_buy(
+            self.esd, self.usdc, self.k, usdc_in)
+        self._price = None
+        return esd_out
+
+    def sell(self, esd_in):
+        """
+        Sell the given ESD for USDC. Returns the USDC received.
+        """
+        self.esd, self.usdc, usdc_out = _pool_sell(
+            self.esd, self.usdc, self.k, esd_in)
+        self._price = None
+        return usdc_out
+
+
+class DAO:
+    """
+    The protocol DAO: tracks epochs, expands supply to bonded holders
+    when ESD trades above the peg, and sells coupons at a premium when
+    it trades below.
+    """
+
+    def __init__(self, uniswap):
+        self.uniswap = uniswap
+        # Current epoch; -1 before the first advance
+        self.epoch = -1
+        # Block the current epoch started at
+        self.epoch_block = 0
+        # Whether the last advance found the price above the peg
+        self.expanding = False
+        # Total ESD in circulation (pool + agents + rewards)
+        self.esd_supply = 0.0
+        # ESD bonded into the DAO, and the shares that represent it
+        self.total_bonded = 0.0
+        self.total_esds = 0.0
+        # Outstanding coupon supply, as ring buffers over the last
+        # COUPON_SLOTS epochs (slot = issuance epoch % COUPON_SLOTS).
+        # Advancing the epoch zeroes the slot it reclaims, so every
+        # populated slot is live by construction and expiry is never
+        # checked per coupon.
+        self.underlying_coupon_supply = np.zeros(COUPON_SLOTS)
+        self.premium_coupon_supply = np.zeros(COUPON_SLOTS)
+        # Running totals over the supply rings, maintained by the
+        # coupon, redeem and advance paths, so total_coupons is two
+        # reads instead of two ring sums every logged block.
+        self._total_underlying = 0.0
+        self._total_premium = 0.0
+        # Supply expansion per epoch, as a fraction of total supply
+        self.interest = 0.0001
+        # ESD reward for advancing the epoch
+        self.advance_reward = 150.0
+
+    def can_advance(self, block):
+        """
+        Return True if the epoch can be advanced at the given block.
+        """
+        return self.epoch == -1 or block - self.epoch_block >= EPOCH_BLOCKS
+
+    def fee(self):
+        """
+        Get the (notional) ETH gas cost of an epoch advance.
+        """
+        return 0.001
+
+    def advance(self, block):
+        """
+        Advance the epoch. Returns the ESD reward for doing so.
+        """
+        self.epoch += 1
+        self.epoch_block = block
+        # The slot the new epoch takes over held coupons issued
+        # COUPON_SLOTS epochs ago, which have just expired.
+        slot = self.epoch % COUPON_SLOTS
+        self._total_underlying -= self.underlying_coupon_supply[slot]
+        if self._total_underlying < 0:
+            self._total_underlying = 0.0
+        self._total_premium -= self.premium_coupon_supply[slot]
+        if self._total_premium < 0:
+            self._total_premium = 0.0
+        self.underlying_coupon_supply[slot] = 0.0
+        self.premium_coupon_supply[slot] = 0.0
+        price = self.uniswap.esd_price()
+        self.expanding = price > 1.0
+        if self.expanding and self.total_bonded > 0:
+            # Expand supply to the bonded holders.
+            expansion = self.esd_supply * self.interest
+            self.total_bonded += expansion
+            self.esd_supply += expansion
+        self.esd_supply += self.advance_reward
+        return self.advance_reward
+
+    def bond(self, esd):
+        """
+        Bond the given ESD. Returns the ESDS shares minted.
+        """
+        new_esds = _dao_bond(self.total_bonded, self.total_esds, esd)
+        self.total_bonded += esd
+        self.total_esds += new_esds
+        return new_esds
+
+    def unbond(self, esds):
+        """
+        Unbond the given ESDS shares. Returns the ESD released.
+        """
+        esd_out = _dao_unbond(self.total_bonded, self.total_esds, esds)
+        self.total_bonded -= esd_out
+        if self.total_bonded < 0:
+            self.total_bonded = 0.0
+        self.total_esds -= esds
+        if self.total_esds < 0:
+            self.total_esds = 0.0
+        return esd_out
+
+    def coupon_premium(self, price):
+        """
+        Get the coupon premium fraction at the given price. Clamped at
+        zero so a price above the peg never yields a negative premium.
+        """
+        return max(0.0, min(0.4, (1.0 - price) / 2))
+
+    def coupon(self, esd, price):
+        """
+        Burn the given ESD on coupons at the given price. Returns the
+        (underlying, premium) coupon amounts issued at this epoch.
+        """
+        underlying = esd
+        premium = esd * self.coupon_premium(price)
+        slot = self.epoch % COUPON_SLOTS
+        self.underlying_coupon_supply[slot] += underlying
+        self.premium_coupon_supply[slot] += premium
+        self._total_underlying += underlying
+        self._total_premium += premium
+        self.esd_supply = max(0, self.esd_supply - esd)
+        return underlying, premium
+
+    def redeem(self, underlying, premium):
+        """
+        Redeem the given coupon rings (per-slot underlying and premium
+        amounts, aligned with the supply rings). Returns the ESD
+        received.
+        """
+        underlying_out = underlying.sum()
+        premium_out = premium.sum()
+        esd_out = underlying_out + premium_out
+        self._total_underlying -= underlying_out
+        if self._total_underlying < 0:
+            self._total_underlying = 0.0
+        self._total_premium -= premium_out
+        if self._total_premium < 0:
+            self._total_premium = 0.0
+        np.subtract(self.underlying_coupon_supply, underlying,
+                    out=self.underlying_coupon_supply)
+        np.maximum(self.underlying_coupon_supply, 0.0,
+                   out=self.underlying_coupon_supply)
+        np.subtract(self.premium_coupon_supply, premium,
+                    out=self.premium_coupon_supply)
+        np.maximum(self.premium_coupon_supply, 0.0,
+                   out=self.premium_coupon_supply)
+        self.esd_supply += esd_out
+        return esd_out
+
+    def total_coupons(self):
+        """
+        Get the total outstanding coupons of both kinds, from the
+        running totals.
+        """
+        return self._total_underlying + self._total_premium
+
+
+class Agent:
+    """
+    One simulated participant in the economy. Balances live in the
+    Model's struct-of-arrays columns (including the coupon ring
+    buffers); the agent is a view into its own index of them, plus its
+    strategy parameters.
+    """
+
+    def __init__(self, balances, agent_id, **kwargs):
+        self._balances = balances
+        self.agent_id = agent_id
+        # How much the agent believes the system's market cap should be
+        # able to reach, if they pay attention to that sort of thing.
+        self.use_faith = kwargs.get('use_faith', True)
+        self.max_faith = kwargs.get('max_faith', 1000000.0)
+        self.min_faith = kwargs.get('min_faith', 500000.0)
+
+    @property
+    def esd(self):
+        return self._balances['esd'][self.agent_id]
+
+    @esd.setter
+    def esd(self, value):
+        self._balances['esd'][self.agent_id] = value
+
+    @property
+    def usdc(self):
+        return self._balances['usdc'][self.agent_id]
+
+    @usdc.setter
+    def usdc(self, value):
+        self._balances['usdc'][self.agent_id] = value
+
+    @property
+    def esds(self):
+        return self._balances['esds'][self.agent_id]
+
+    @esds.setter
+    def esds(self, value):
+        self._balances['esds'][self.agent_id] = value
+
+    @property
+    def eth(self):
+        return self._balances['eth'][self.agent_id]
+
+    @eth.setter
+    def eth(self, value):
+        self._balances['eth'][self.agent_id] = value
+
+    @property
+    def lp(self):
+        return self._balances['lp'][self.agent_id]
+
+    @lp.setter
+    def lp(self, value):
+        self._balances['lp'][self.agent_id] = value
+
+
+class Model:
+    """
+    Full model of the economy: a pool, a DAO, and a population of
+    agents taking actions against them, one block at a time.
+    """
+
+    def __init__(self, **kwargs):
+        self.uniswap = UniswapPool()
+        self.dao = DAO(self.uniswap)
+        self.block = 0
+        # Whether the epoch can currently be advanced. Only an advance
+        # resets it, so blocks in between skip the DAO arithmetic.
+        self._advance_ready = True
+
+        # Balances in struct-of-arrays columns: one contiguous array
+        # per balance kind, one slot per agent, so eligibility tests
+        # and aggregate statistics are bulk array operations. Agent-
+        # local amounts are float32 -- half the bandwidth and twice
+        # the SIMD lanes, and single precision is ample for balances
+        # that top out around 1e5. The pool and DAO totals stay
+        # float64, since those accumulate over the whole run.
+        self.agent_balances = {
+            field: np.zeros(N_AGENTS, dtype=np.float32)
+            for field in ('esd', 'usdc', 'esds', 'eth', 'lp')}
+
+        # Coupons held per agent, as (agent x slot) ring buffers
+        # matching the DAO's supply rings. Epoch advances zero the
+        # reclaimed column, so expiry is a single column write instead
+        # of a per-agent dict sweep, and redeeming is a row sum.
+        self.coupon_underlying = np.zeros((N_AGENTS, COUPON_SLOTS),
+                                          dtype=np.float32)
+        self.coupon_premium = np.zeros((N_AGENTS, COUPON_SLOTS),
+                                       dtype=np.float32)
+        # Whether each agent holds any coupons at all, maintained on
+        # the coupon, redeem and advance actions, so the per-block
+        # redeem eligibility never has to scan the rings.
+        self._has_coupons = np.zeros(N_AGENTS, dtype=bool)
+
+        # Whether to narrate every block and action to stdout. Sweeps
+        # run silent: the printing costs more than the economics.
+        self.verbose = kwargs.pop('verbose', False)
+
+        # One generator for all the model's random draws, so a step can
+        # fill every agent's random numbers in a couple of C-level calls.
+        self._rng = np.random.default_rng(kwargs.pop('seed', None))
+
+        # Bound action handlers aligned with ACTIONS, so the narrated
+        # path dispatches on the sampled action id with one tuple index
+        # instead of a chain of string compares.
+        self._dispatch = (
+            self._do_buy, self._do_sell, self._do_advance, self._do_bond,
+            self._do_unbond, self._do_coupon, self._do_redeem,
+            self._do_deposit, self._do_withdraw)
+
+        self.agents = []
+        for agent_id in range(N_AGENTS):
+            agent = Agent(self.agent_balances, agent_id, **kwargs)
+            agent.usdc = _rand() * 100000.0
+            agent.eth = _rand() * 10.0
+            self.agents.append(agent)
+
+        # Which agents take the faith bit of the strategy regime.
+        self._use_faith = np.array([a.use_faith for a in self.agents])
+
+        # Scratch buffers the sampler refills in place every block,
+        # rather than allocating fresh (agents x actions) arrays
+        # tens of thousands of times per run.
+        self._weights = np.empty((N_AGENTS, len(ACTIONS)))
+        self._cdf = np.empty((N_AGENTS, len(ACTIONS)))
+
+    def get_overall_faith(self):
+        """
+        Get the faith value all the agents share right now, from the
+        precomputed sine table.
+        """
+        a = self.agents[0]
+        return ((a.max_faith + a.min_faith) / 2 +
+                (a.max_faith - a.min_faith) / 2 *
+                _SIN_TABLE[self.block % 5000])
+
+    def _do_buy(self, agent_num, a, commitment, price):
+        usdc = portion_dedusted(a.usdc, commitment)
+        esd = self.uniswap.buy(usdc)
+        a.usdc -= usdc
+        a.esd += esd
+        if self.verbose:
+            print('agent {} buys {:.2f} ESD for {:.2f} USDC'.format(
+                agent_num, esd, usdc))
+
+    def _do_sell(self, agent_num, a, commitment, price):
+        esd = portion_dedusted(a.esd, commitment)
+        usdc = self.uniswap.sell(esd)
+        a.esd -= esd
+        a.usdc += usdc
+        if self.verbose:
+            print('agent {} sells {:.2f} ESD for {:.2f} USDC'.format(
+                agent_num, esd, usdc))
+
+    def _do_advance(self, agent_num, a, commitment, price):
+        dao = self.dao
+        # Re-check between agents: the first advance this block
+        # consumes the epoch, so later sampled advances are illegal
+        # even though they were eligible at block start.
+        if not dao.can_advance(self.block):
+            return
+        a.eth -= dao.fee()
+        a.esd += dao.advance(self.block)
+        self._advance_ready = False
+        # The ring slot the new epoch reclaims held coupons that have
+        # just expired; clear everyone's column.
+        slot = dao.epoch % COUPON_SLOTS
+        self.coupon_underlying[:, slot] = 0.0
+        self.coupon_premium[:, slot] = 0.0
+        # The cleared column may have been someone's last coupons.
+        np.any(self.coupon_underlying, axis=1, out=self._has_coupons)
+        if self.verbose:
+            print('agent {} advances to epoch {}'.format(
+                agent_num, dao.epoch))
+
+    def _do_bond(self, agent_num, a, commitment, price):
+        esd = portion_dedusted(a.esd, commitment)
+        a.esds += self.dao.bond(esd)
+        a.esd -= esd
+        if self.verbose:
+            print('agent {} bonds {:.2f} ESD'.format(agent_num, esd))
+
+    def _do_unbond(self, agent_num, a, commitment, price):
+        esds = portion_dedusted(a.esds, commitment)
+        a.esd += self.dao.unbond(esds)
+        a.esds -= esds
+        if self.verbose:
+            print('agent {} unbonds {:.2f} ESDS'.format(agent_num, esds))
+
+    def _do_coupon(self, agent_num, a, commitment, price):
+        esd = portion_dedusted(a.esd, commitment)
+        underlying, premium = self.dao.coupon(esd, price)
+        slot = self.dao.epoch % COUPON_SLOTS
+        self.coupon_underlying[agent_num, slot] += underlying
+        self.coupon_premium[agent_num, slot] += premium
+        self._has_coupons[agent_num] = True
+        a.esd -= esd
+        if self.verbose:
+            print('agent {} burns {:.2f} ESD for coupons'.format(
+                agent_num, esd))
+
+    def _do_redeem(self, agent_num, a, commitment, price):
+        underlying_row = self.coupon_underlying[agent_num]
+        premium_row = self.coupon_premium[agent_num]
+        total = self.dao.redeem(underlying_row, premium_row)
+        underlying_row[:] = 0.0
+        premium_row[:] = 0.0
+        self._has_coupons[agent_num] = False
+        a.esd += total
+        if self.verbose:
+            print('agent {} redeems coupons for {:.2f} ESD'.format(
+                agent_num, total))
+
+    def _do_deposit(self, agent_num, a, commitment, price):
+        usdc = portion_dedusted(a.usdc, commitment)
+        # Price starts at 1 ESD = 1 USDC before the pool launches.
+        esd = usdc / price
+        if a.esd < esd:
+            return
+        a.lp += self.uniswap.deposit(esd, usdc)
+        a.esd -= esd
+        a.usdc -= usdc
+        if self.verbose:
+            print('agent {} deposits {:.2f} ESD and {:.2f} USDC'.format(
+                agent_num, esd, usdc))
+
+    def _do_withdraw(self, agent_num, a, commitment, price):
+        lp = portion_dedusted(a.lp, commitment)
+        esd, usdc = self.uniswap.withdraw(lp)
+        a.lp -= lp
+        a.esd += esd
+        a.usdc += usdc
+        if self.verbose:
+            print('agent {} withdraws {:.2f} ESD and {:.2f} USDC'.format(
+                agent_num, esd, usdc))
+
+    def log_line(self):
+        """
+        Format one TSV line of overall simulation state, so callers
+        can batch lines up and write them out every so often.
+        """
+        return _LOG_LINE(
+            self.block,
+            self.dao.epoch,
+            self.uniswap.esd_price(),
+            self.dao.esd_supply,
+            self.dao.total_coupons(),
+            self.get_overall_faith())
+
+    def log(self, stream, header=False):
+        """
+        Log a TSV line of overall simulation state to the given stream.
+        """
+        if header:
+            stream.write('#block\tepoch\tprice\tsupply\tcoupons\tfaith\n')
+        stream.write(self.log_line())
+
+    def step(self):
+        """
+        Run one simulated block: every agent gets a chance to take one
+        action.
+        """
+        self.block += 1
+        if self.verbose:
+            print('block: {}'.format(self.block))
+
+        # Locals for everything the loop body re-reads: the pool, the
+        # DAO, and the per-block constants fee and can_advance, so the
+        # hot path skips the repeated attribute and method dispatch.
+        uniswap = self.uniswap
+        dao = self.dao
+        balances = self.agent_balances
+        fee = dao.fee()
+        if not self._advance_ready:
+            self._advance_ready = self.block - dao.epoch_block >= EPOCH_BLOCKS
+        can_adv = self._advance_ready
+
+        # Eligibility per action, computed for all agents at once over
+        # the struct-of-arrays columns before the decision loop.
+        operational = uniswap.operational()
+        block_price = uniswap.esd_price()
+        mask_buy = (balances['usdc'] > 0) & operational
+        mask_sell = (balances['esd'] > 0) & operational
+        mask_advance = (balances['eth'] >= fee) & can_adv
+        mask_bond = balances['esd'] > 0
+        mask_unbond = balances['esds'] > 0
+        mask_deposit = (balances['usdc'] > 0) & (balances['esd'] > 0)
+        mask_withdraw = balances['lp'] > 0
+
+        # Every populated ring slot is live by construction, so coupon
+        # eligibility is the contraction state -- checked against the
+        # live price as well as the last advance's flag, so a price
+        # that recovers above the peg mid-epoch stops coupon buying
+        # (the premium would be zero) -- and redemption is holding
+        # anything during an expansion.
+        mask_coupon = mask_bond & (not dao.expanding and block_price < 1.0)
+        mask_redeem = self._has_coupons & dao.expanding
+
+        # Build the (agents x actions) weight matrix, zero the
+        # ineligible entries, and draw every agent's action and
+        # commitment fraction in a few batched RNG calls instead of a
+        # random.choices and a random.random per agent.
+        # All the agents share the same faith parameters, so the faith
+        # value comes from the tracked sine once per block.
+        block_faith = self.get_overall_faith()
+        # Strategy is a pure function of the block's regime, so every
+        # agent's weight row is a table gather, not a method call.
+        over_faith = block_price * dao.esd_supply > block_faith
+        regimes = ((block_price > 1.0) << 1) + (self._use_faith & over_faith)
+        weights = self._weights
+        np.take(_STRATEGIES, regimes, axis=0, out=weights)
+        # Pack the nine eligibility tests into one bitmask per agent
+        # and gather the matching 0/1 weight rows from the table.
+        elig = (mask_buy.astype(np.uint16)
+                | mask_sell.astype(np.uint16) << 1
+                | mask_advance.astype(np.uint16) << 2
+                | mask_bond.astype(np.uint16) << 3
+                | mask_unbond.astype(np.uint16) << 4
+                | mask_coupon.astype(np.uint16) << 5
+                | mask_redeem.astype(np.uint16) << 6
+                | mask_deposit.astype(np.uint16) << 7
+                | mask_withdraw.astype(np.uint16) << 8)
+        # Gather the eligibility rows into the cdf scratch, mask the
+        # weights with them in place, then overwrite the scratch with
+        # the cumulative sums.
+        np.take(_ELIGIBILITY, elig, axis=0, out=self._cdf)
+        np.multiply(weights, self._cdf, out=weights)
+        cdf = np.cumsum(weights, axis=1, out=self._cdf)
+        totals = cdf[:, -1]
+        draws = self._rng.random(N_AGENTS) * totals
+        actions = (cdf <= draws[:, None]).sum(axis=1)
+        # What fraction of the relevant balance each agent commits to
+        # its action.
+        commitments = self._rng.random(N_AGENTS) * 0.1
+
+        if not self.verbose:
+            # Silent runs dispatch every agent's action in one fused
+            # JIT kernel over the struct-of-arrays state; the narrated
+            # loop below is the reference path and must stay in step.
+            (uniswap.esd, uniswap.usdc, uniswap.total_shares, uniswap.k,
+             dao.epoch, dao.epoch_block, expanding,
+             dao.esd_supply, dao.total_bonded, dao.total_esds,
+             dao._total_underlying, dao._total_premium,
+             advanced) = _step_kernel(
+                actions, commitments, totals,
+                balances['esd'], balances['usdc'], balances['esds'],
+                balances['eth'], balances['lp'],
+                self.coupon_underlying, self.coupon_premium,
+                self._has_coupons,
+                dao.underlying_coupon_supply, dao.premium_coupon_supply,
+                dao._total_underlying, dao._total_premium,
+                uniswap.esd, uniswap.usdc, uniswap.total_shares, uniswap.k,
+                dao.epoch, dao.epoch_block, dao.expanding,
+                dao.esd_supply, dao.total_bonded, dao.total_esds,
+                dao.interest, dao.advance_reward, fee, self.block)
+            dao.expanding = bool(expanding)
+            uniswap._price = None
+            if advanced:
+                self._advance_ready = False
+            return
+
+        for agent_num, a in enumerate(self.agents):
+            if totals[agent_num] == 0:
+                # Nothing to do
+                continue
+            self._dispatch[actions[agent_num]](
+                agent_num, a, commitments[agent_num], uniswap.esd_price())
+
+
+def _run_one(seed_steps):
+    """
+    Run one independent replicate of the model, with its own seed.
+    Returns a compact dict of results for aggregation.
+    """
+    seed, steps = seed_steps
+    random.seed(seed)
+    model = Model(seed=seed)
+    prices = []
+    for _ in range(steps):
+        model.step()
+        prices.append(model.uniswap.esd_price())
+    return {
+        'seed': seed,
+        'prices': prices,
+        'final_supply': model.dao.esd_supply,
+        'final_coupons': model.dao.total_coupons(),
+        'final_esd': model.agent_balances['esd'].copy(),
+        'final_usdc': model.agent_balances['usdc'].copy(),
+    }
+
+
+def run_batch(n_runs, steps, seed=0):
+    """
+    Run many independent replicates of the model in parallel across
+    cores, for Monte Carlo statistics. Returns each replicate's result
+    dict from _run_one, in seed order.
+    """
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        return list(executor.map(
+            _run_one, [(seed + run, steps) for run in range(n_runs)]))
+
+
+def main():
+    """
+    Main function: run the model and log its state per block.
+    """
+    model = Model()
+
+    # Batch the log lines in memory and write them out every so often
+    # through a large stdio buffer; a write() per block was a
+    # measurable share of a silent run.
+    stream = open('pure_log.tsv', 'w', buffering=1 << 20)
+    model.log(stream, header=True)
+
+    rows = []
+    start = time.time()
+    for i in range(50000):
+        model.step()
+        rows.append(model.log_line())
+        if len(rows) >= 1000:
+            stream.writelines(rows)
+            rows.clear()
+            end = time.time()
+            print('iter: %s, sys time %s' % (i, end - start))
+            start = end
+    stream.writelines(rows)
+    stream.close()
+
+
+if __name__ == '__main__':
+    main()